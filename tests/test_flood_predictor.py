@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from utils.models.flood_predictor import FloodPredictor, FEATURE_NAMES
+from utils.sensor_data import generate_historical_data
+
+
+@pytest.fixture(scope="module")
+def predictor(tmp_path_factory):
+    np.random.seed(0)
+    df = generate_historical_data(365)
+    predictor = FloodPredictor(model_path=tmp_path_factory.mktemp("model") / "model.pkl")
+    predictor.train(df)
+    return predictor
+
+
+def test_attributions_sum_to_predict_proba(predictor):
+    rng = np.random.default_rng(0)
+    X_scaled = rng.normal(size=(500, len(FEATURE_NAMES)))
+
+    explained = predictor.explain(X_scaled)
+    expected = predictor.model.predict_proba(X_scaled)[:, 1]
+
+    assert explained["contributions"].shape == (500, len(FEATURE_NAMES))
+    np.testing.assert_allclose(explained["probability"], expected, atol=1e-9)
+    np.testing.assert_allclose(
+        explained["bias"] + explained["contributions"].sum(axis=1), expected, atol=1e-9
+    )
+
+
+def test_confidence_matches_tree_votes(predictor):
+    rng = np.random.default_rng(1)
+    X_scaled = rng.normal(size=(50, len(FEATURE_NAMES)))
+
+    explained = predictor.explain(X_scaled)
+    votes = np.array([est.predict_proba(X_scaled)[:, 1] > 0.5 for est in predictor.model.estimators_]).T
+    ensemble = explained["probability"] > 0.5
+    expected = (votes == ensemble[:, None]).mean(axis=1)
+
+    np.testing.assert_allclose(explained["confidence"], expected)
+
+
+def test_predict_stations_breakdown(predictor):
+    sensors = [
+        {"id": "WL001", "name": "A", "type": "water_level", "value": 3.2, "lat": 53.42, "lon": -7.94},
+        {"id": "WL002", "name": "B", "type": "water_level", "value": 1.4, "lat": 53.52, "lon": -7.33},
+        {"id": "RF001", "name": "C", "type": "rainfall", "value": 12.0, "lat": 53.43, "lon": -7.92},
+        {"id": "SM001", "name": "D", "type": "soil_moisture", "value": 80.0, "lat": 53.48, "lon": -7.37},
+    ]
+    results = predictor.predict_stations(sensors, {"forecast": []})
+
+    assert [r["id"] for r in results] == ["WL001", "WL002"]
+    for r in results:
+        assert set(r["factor_contributions"]) == set(FEATURE_NAMES)
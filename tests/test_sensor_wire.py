@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from utils.sensor_wire import (
+    HEADER_DTYPE, RECORD_DTYPE, WireFormatError,
+    decode_batch, encode_batch, encode_sensors, read_batches,
+)
+
+IDS = ["WL001", "RF001", "SM001"]
+
+
+def make_batch(ids=IDS, timestamp=1.7e9):
+    return encode_batch(
+        timestamp,
+        sensor=[0, 1, 2, 0],
+        value=[2.75, 4.5, 81.0, 2.8],
+        sensor_type=[0, 1, 2, 0],
+        status=[1, 0, 2, 1],
+        offset=[0, 0, 0, 0.5],
+        ids=ids,
+    )
+
+
+def test_round_trip():
+    batch = decode_batch(make_batch())
+
+    assert batch["timestamp"] == 1.7e9
+    assert batch["ids"] == IDS
+    np.testing.assert_array_equal(batch["sensor"], [0, 1, 2, 0])
+    np.testing.assert_array_equal(batch["value"], np.array([2.75, 4.5, 81.0, 2.8], dtype=np.float32))
+    np.testing.assert_array_equal(batch["type"], [0, 1, 2, 0])
+    np.testing.assert_array_equal(batch["status"], [1, 0, 2, 1])
+    np.testing.assert_array_equal(batch["offset"], [0, 0, 0, 0.5])
+
+
+def test_record_size():
+    with_table = make_batch()
+    without_table = make_batch(ids=None)
+    assert len(without_table) == HEADER_DTYPE.itemsize + 4 * RECORD_DTYPE.itemsize
+    assert len(with_table) > len(without_table)
+
+
+def test_read_batches_carries_id_table_forward():
+    buf = make_batch() + make_batch(ids=None, timestamp=1.7e9 + 1)
+    batches = list(read_batches(buf))
+
+    assert [b["timestamp"] for b in batches] == [1.7e9, 1.7e9 + 1]
+    assert batches[1]["ids"] == IDS
+
+
+def test_empty_table_is_not_reuse():
+    batch = decode_batch(encode_sensors([], timestamp=0))
+    assert batch["ids"] == []
+    assert len(batch["sensor"]) == 0
+
+
+def test_missing_table_without_previous_ids():
+    with pytest.raises(WireFormatError):
+        decode_batch(make_batch(ids=None))
+
+
+@pytest.mark.parametrize("cut", [0, 10, HEADER_DTYPE.itemsize + 2, HEADER_DTYPE.itemsize + 6, -1])
+def test_truncated_buffer(cut):
+    buf = make_batch()
+    with pytest.raises(WireFormatError):
+        decode_batch(buf[:cut])
+
+
+def test_truncated_stream():
+    buf = make_batch() + make_batch(ids=None)
+    with pytest.raises(WireFormatError):
+        list(read_batches(buf[:-3]))
+
+
+def test_bad_magic():
+    buf = bytearray(make_batch())
+    buf[:4] = b"XXXX"
+    with pytest.raises(WireFormatError):
+        decode_batch(bytes(buf))
+
+
+@pytest.mark.parametrize("field, value", [("sensor", 3), ("type", 3), ("status", 3)])
+def test_out_of_range_codes(field, value):
+    kwargs = dict(sensor=[0], value=[1.0], sensor_type=[0], status=[0], ids=IDS)
+    kwargs["sensor_type" if field == "type" else field] = [value]
+    with pytest.raises(WireFormatError):
+        decode_batch(encode_batch(0, **kwargs))
+
+
+def test_newline_in_id_rejected():
+    with pytest.raises(WireFormatError):
+        make_batch(ids=["WL001\nX", "RF001", "SM001"])
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+
+def _json_default(value):
+    """Allow NumPy scalars inside JSON inputs; anything else can't be hashed reliably"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot hash figure input of type {type(value).__name__}")
+
+
+def _update(h, value):
+    """Feed one input into the hash by content"""
+    if isinstance(value, pd.DataFrame):
+        h.update(b"df")
+        h.update(json.dumps(list(map(str, value.columns))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(b"nd")
+        h.update(f"{value.dtype.str}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    else:
+        h.update(b"js")
+        h.update(json.dumps(value, sort_keys=True, default=_json_default).encode())
+    h.update(b"\x00")
+
+
+def content_hash(*args, **kwargs) -> str:
+    """Hash the content of figure inputs (lists of dicts, DataFrames, arrays, scalars)
+
+    Raises TypeError for inputs it can't hash by content.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for value in args:
+        _update(h, value)
+    for name, value in sorted(kwargs.items()):
+        h.update(name.encode() + b"=")
+        _update(h, value)
+    return h.hexdigest()
+
+
+def memoize_figure(maxsize: int = 32):
+    """Cache a figure builder on a content hash of its inputs
+
+    Unchanged inputs return the same figure object to every session, so
+    only use it for figures that are not mutated when rendered (Plotly
+    figures, not folium maps).
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = content_hash(*args, **kwargs)
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+
+            fig = func(*args, **kwargs)
+
+            with lock:
+                cache[key] = fig
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return fig
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
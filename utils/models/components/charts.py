@@ -1,7 +1,9 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+from components.cache import memoize_figure
 
+@memoize_figure()
 def create_water_level_chart(sensors: list):
     """Create water level bar chart"""
     water_sensors = [s for s in sensors if s['type'] == 'water_level']
@@ -40,6 +42,7 @@ def create_water_level_chart(sensors: list):
     
     return fig
 
+@memoize_figure()
 def create_historical_chart(df: pd.DataFrame):
     """Create historical trends chart"""
     fig = go.Figure()
@@ -63,6 +66,7 @@ def create_historical_chart(df: pd.DataFrame):
     
     return fig
 
+@memoize_figure()
 def create_risk_gauge(probability: float):
     """Create risk probability gauge"""
     fig = go.Figure(go.Indicator(
@@ -89,3 +93,34 @@ def create_risk_gauge(probability: float):
     
     fig.update_layout(height=300)
     return fig
+
+@memoize_figure()
+def create_factor_breakdown_chart(station_predictions: list):
+    """Create per-station stacked chart of feature contributions"""
+    fig = go.Figure()
+    
+    names = [p['name'] for p in station_predictions]
+    features = list(station_predictions[0].get('factor_contributions', {})) if station_predictions else []
+    
+    for feature in features:
+        fig.add_trace(go.Bar(
+            y=names,
+            x=[p['factor_contributions'][feature] for p in station_predictions],
+            name=feature,
+            orientation='h'
+        ))
+    
+    fig.update_layout(
+        title="Risk Contributions by Station (percentage points)",
+        xaxis_title="Contribution to probability (%)",
+        barmode='relative',
+        height=350,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02)
+    )
+    
+    return fig
+
+@memoize_figure()
+def create_feature_importance_chart(features: list, importances: list):
+    """Create global feature importance bar chart"""
+    return px.bar(x=features, y=importances, title="Feature Importance")
@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import time
 
 # Import utilities
 from utils.met_eireann import fetch_weather_data, get_weather_description, get_weather_icon
 from utils.sensor_data import generate_sensor_data, generate_historical_data
-from models.flood_predictor import FloodPredictor
-from components.charts import create_water_level_chart, create_historical_chart, create_risk_gauge
+from models.flood_predictor import FloodPredictor, FEATURE_NAMES
+from models.model_registry import ModelRegistry, RegistryError
+from components.charts import (
+    create_water_level_chart, create_historical_chart, create_risk_gauge, create_factor_breakdown_chart,
+    create_feature_importance_chart
+)
 from components.map_view import create_sensor_map
+from components.cache import content_hash
 from streamlit_folium import st_folium
 
 # Page config
@@ -31,18 +35,76 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_model_registry():
+    """Shared model registry; trains the first model in the background if none exists"""
+    registry = ModelRegistry()
+    if not registry.load_current():
+        registry.retrain_async(lambda: generate_historical_data(365))
+    return registry
+
+registry = get_model_registry()
+
 # Initialize session state
-if 'predictor' not in st.session_state:
-    st.session_state.predictor = FloodPredictor()
+if 'historical_data' not in st.session_state:
     st.session_state.historical_data = generate_historical_data(365)
+
+# Serve whichever model is active right now; rule-based until one is promoted
+model_version, predictor = registry.serving()
+predictor = predictor or FloodPredictor()
+
+# Model state the static sections were rendered with, checked by the live fragments
+st.session_state.rendered_model_state = (model_version, registry.is_retraining)
+
+class WeatherUnavailable(Exception):
+    pass
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_weather():
+    """Weather changes slowly, so share one fetch across refreshes and sessions"""
+    weather = fetch_weather_data()
+    if weather is None:
+        # Raising keeps the failure out of the cache, so the next refresh retries
+        raise WeatherUnavailable()
+    return weather
+
+def load_weather():
+    """Cached weather, or None if the fetch failed"""
+    try:
+        return _cached_weather()
+    except WeatherUnavailable:
+        return None
+
+def get_live_data(max_age: float) -> dict:
+    """Latest sensors and prediction, refreshed at most once per max_age seconds
     
-    # Try to load or train model
-    if not st.session_state.predictor.load():
-        accuracy = st.session_state.predictor.train(st.session_state.historical_data)
-        st.session_state.model_accuracy = accuracy
+    Both live fragments call this, so whichever runs first on a tick fetches
+    and the other reuses the same snapshot.
+    """
+    live = st.session_state.get('live_data')
+    if (live is None
+            or live['model_version'] != registry.active_version
+            or (datetime.now() - live['fetched_at']).total_seconds() >= max_age):
+        weather = load_weather()
+        sensors = generate_sensor_data()
+        # Fragment reruns skip the top of the script, so look up the serving model here
+        version, predictor = registry.serving()
+        predictor = predictor or FloodPredictor()
+        live = {
+            'fetched_at': datetime.now(),
+            'model_version': version,
+            'predictor': predictor,
+            'weather': weather,
+            'sensors': sensors,
+            'prediction': predictor.predict(sensors, weather or {})
+        }
+        st.session_state.live_data = live
+    return live
 
-if 'last_refresh' not in st.session_state:
-    st.session_state.last_refresh = datetime.now()
+def rerun_if_model_changed():
+    """Rerun the whole app once a retrain finishes so every section uses the same model"""
+    if (registry.active_version, registry.is_retraining) != st.session_state.rendered_model_state:
+        st.rerun(scope="app")
 
 # Sidebar
 with st.sidebar:
@@ -59,78 +121,103 @@ with st.sidebar:
     refresh_interval = st.slider("Interval (seconds)", 30, 300, 60)
     
     if st.button("🔄 Refresh Now", use_container_width=True):
-        st.session_state.last_refresh = datetime.now()
+        st.session_state.pop('live_data', None)
         st.rerun()
     
-    st.divider()
-    st.caption(f"Last updated: {st.session_state.last_refresh.strftime('%H:%M:%S')}")
-    
     # Model info
     st.divider()
     st.subheader("🤖 ML Model")
-    if st.session_state.predictor.is_trained:
-        st.success("Model trained ✓")
-        if hasattr(st.session_state, 'model_accuracy'):
-            st.metric("Training Accuracy", f"{st.session_state.model_accuracy:.1%}")
+    versions = {v['version']: v for v in registry.list_versions()}
+    if predictor.is_trained:
+        st.success(f"Model {registry.active_version} ✓")
+        metrics = versions.get(registry.active_version, {}).get('metrics', {})
+        if 'training_accuracy' in metrics:
+            st.metric("Training Accuracy", f"{metrics['training_accuracy']:.1%}")
     else:
         st.warning("Using rule-based fallback")
+    
+    if registry.last_error:
+        st.error(f"Last retrain failed: {registry.last_error}")
+    
+    if registry.is_retraining:
+        st.info("Retraining in background...")
+    elif st.button("🧠 Retrain Model", use_container_width=True):
+        registry.retrain_async(lambda: generate_historical_data(365))
+        st.rerun()
+    
+    # A rollback mid-retrain would skip promoting the new model, so wait for it
+    if len(versions) > 1 and not registry.is_retraining and st.button("⏪ Roll Back", use_container_width=True):
+        try:
+            registry.rollback()
+        except RegistryError as e:
+            st.error(str(e))
+        else:
+            st.rerun()
 
 # Main content
 st.title("🌊 WaterWatch Dashboard")
 st.caption("Real-time flood monitoring for County Westmeath")
 
-# Fetch data
-weather = fetch_weather_data()
-sensors = generate_sensor_data()
-prediction = st.session_state.predictor.predict(sensors, weather or {})
-
-# Top row - Key metrics
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    risk_class = f"risk-{prediction['risk_level']}"
-    st.markdown(f"""
-    <div class="{risk_class}">
-        <h3>🎯 Flood Risk</h3>
-        <h1>{prediction['risk_level'].upper()}</h1>
-        <p>{prediction['probability']}% probability</p>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col2:
-    if weather:
-        icon = get_weather_icon(weather['current']['weather_code'])
-        st.metric(
-            f"{icon} Temperature",
-            f"{weather['current']['temperature']}°C",
-            f"Humidity: {weather['current']['humidity']}%"
-        )
-    else:
-        st.metric("🌡️ Temperature", "N/A")
+# Only the live widgets rerun on the refresh timer; everything else reruns on
+# interaction or "Refresh Now"
+run_every = refresh_interval if auto_refresh else None
+max_age = refresh_interval * 0.9
 
-with col3:
-    if weather:
+@st.fragment(run_every=run_every)
+def live_metrics():
+    rerun_if_model_changed()
+    live = get_live_data(max_age)
+    weather, sensors, prediction = live['weather'], live['sensors'], live['prediction']
+    
+    # Top row - Key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        risk_class = f"risk-{prediction['risk_level']}"
+        st.markdown(f"""
+        <div class="{risk_class}">
+            <h3>🎯 Flood Risk</h3>
+            <h1>{prediction['risk_level'].upper()}</h1>
+            <p>{prediction['probability']}% probability</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        if weather:
+            icon = get_weather_icon(weather['current']['weather_code'])
+            st.metric(
+                f"{icon} Temperature",
+                f"{weather['current']['temperature']}°C",
+                f"Humidity: {weather['current']['humidity']}%"
+            )
+        else:
+            st.metric("🌡️ Temperature", "N/A")
+    
+    with col3:
+        if weather:
+            st.metric(
+                "🌧️ Current Rainfall",
+                f"{weather['current']['precipitation']} mm",
+                f"Wind: {weather['current']['wind_speed']} km/h"
+            )
+    
+    with col4:
+        critical_count = len([s for s in sensors if s['status'] == 'critical'])
+        warning_count = len([s for s in sensors if s['status'] == 'warning'])
         st.metric(
-            "🌧️ Current Rainfall",
-            f"{weather['current']['precipitation']} mm",
-            f"Wind: {weather['current']['wind_speed']} km/h"
+            "⚠️ Alerts",
+            f"{critical_count} Critical",
+            f"{warning_count} Warnings"
         )
+    
+    st.caption(f"Last updated: {live['fetched_at'].strftime('%H:%M:%S')}")
 
-with col4:
-    critical_count = len([s for s in sensors if s['status'] == 'critical'])
-    warning_count = len([s for s in sensors if s['status'] == 'warning'])
-    st.metric(
-        "⚠️ Alerts",
-        f"{critical_count} Critical",
-        f"{warning_count} Warnings"
-    )
-
-st.divider()
-
-# Main dashboard
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🗺️ Map", "📈 Historical", "🔬 ML Analysis"])
-
-with tab1:
+@st.fragment(run_every=run_every)
+def live_overview():
+    rerun_if_model_changed()
+    live = get_live_data(max_age)
+    sensors, prediction = live['sensors'], live['prediction']
+    
     col1, col2 = st.columns([2, 1])
     
     with col1:
@@ -162,10 +249,32 @@ with tab1:
             {trend_emoji.get(sensor['trend'], '')} {sensor['trend']}
             """)
 
+live_metrics()
+
+# Snapshot for the static sections, taken on full reruns only
+live = get_live_data(max_age)
+weather, sensors, prediction = live['weather'], live['sensors'], live['prediction']
+predictor = live['predictor']
+station_predictions = predictor.predict_stations(sensors, weather or {})
+
+st.divider()
+
+# Main dashboard
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🗺️ Map", "📈 Historical", "🔬 ML Analysis"])
+
+with tab1:
+    live_overview()
+
 with tab2:
     st.subheader("Sensor Locations")
-    sensor_map = create_sensor_map(sensors)
-    st_folium(sensor_map, width=None, height=500)
+    # folium maps are mutated while rendering, so each session keeps its own
+    map_key = content_hash(sensors)
+    if st.session_state.get('sensor_map_key') != map_key:
+        st.session_state.sensor_map = create_sensor_map(sensors)
+        st.session_state.sensor_map_key = map_key
+    sensor_map = st.session_state.sensor_map
+    # No returned objects, so panning and zooming don't rerun the app
+    st_folium(sensor_map, width=None, height=500, key="sensor_map", returned_objects=[])
     
     # Legend
     col1, col2, col3 = st.columns(3)
@@ -207,14 +316,28 @@ with tab4:
         st.write("**Current Prediction:**")
         st.json(prediction)
         
+    # Per-station attributions
+    st.subheader("Station Risk Breakdown")
+    if station_predictions:
+        st.dataframe(
+            pd.DataFrame([{
+                "Station": p['name'],
+                "Risk": p['risk_level'].title(),
+                "Probability (%)": p['probability'],
+                "Confidence (%)": p['confidence'],
+                "Top Factors": ", ".join(p['contributing_factors'])
+            } for p in station_predictions]),
+            use_container_width=True,
+            hide_index=True
+        )
+        if predictor.is_trained:
+            fig = create_factor_breakdown_chart(station_predictions)
+            st.plotly_chart(fig, use_container_width=True)
+    
     # Feature importance (if model is trained)
-    if st.session_state.predictor.is_trained:
-        st.subheader("Feature Importance")
-        importances = st.session_state.predictor.model.feature_importances_
-        features = ['Rainfall', 'Water Level', 'Soil Moisture', '3-Day Rain', '7-Day Rain', 'Level Trend']
-        
-        import plotly.express as px
-        fig = px.bar(x=features, y=importances, title="Feature Importance")
+    if predictor.is_trained:
+        st.subheader("Global Feature Importance")
+        fig = create_feature_importance_chart(FEATURE_NAMES, predictor.model.feature_importances_.tolist())
         st.plotly_chart(fig, use_container_width=True)
 
 # 5-Day Forecast
@@ -233,8 +356,3 @@ if weather:
             🌡️ {day['temp_max']}° / {day['temp_min']}°  
             🌧️ {day['precipitation']} mm
             """)
-
-# Auto refresh
-if auto_refresh:
-    time.sleep(refresh_interval)
-    st.rerun()
@@ -5,8 +5,10 @@ from sklearn.preprocessing import StandardScaler
 import pickle
 from pathlib import Path
 
+FEATURE_NAMES = ['Rainfall', 'Water Level', 'Soil Moisture', '3-Day Rain', '7-Day Rain', 'Level Trend']
+
 class FloodPredictor:
-    def __init__(self):
+    def __init__(self, model_path: Path = None):
         self.model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
@@ -14,7 +16,8 @@ class FloodPredictor:
         )
         self.scaler = StandardScaler()
         self.is_trained = False
-        self.model_path = Path("models/trained_model.pkl")
+        self.model_path = Path(model_path or "models/trained_model.pkl")
+        self._paths = None
         
     def prepare_features(self, df: pd.DataFrame) -> np.ndarray:
         """Extract features from dataframe"""
@@ -40,9 +43,10 @@ class FloodPredictor:
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
         self.is_trained = True
+        self._paths = None
         
         # Save model
-        self.model_path.parent.mkdir(exist_ok=True)
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
         with open(self.model_path, 'wb') as f:
             pickle.dump({
                 'model': self.model,
@@ -59,9 +63,131 @@ class FloodPredictor:
                 self.model = saved['model']
                 self.scaler = saved['scaler']
                 self.is_trained = True
+                self._paths = None
                 return True
         return False
     
+    def prepare(self):
+        """Build the attribution tables now, so the first explain() doesn't pay for it"""
+        if self.is_trained:
+            self._build_paths()
+    
+    def _build_paths(self):
+        """Precompute per-node path contributions for the whole forest
+        
+        Each edge credits its change in class probability to the split
+        feature; accumulating those from the root gives every node the
+        contribution vector of the path that ends there.
+        """
+        cls = list(self.model.classes_).index(1) if 1 in self.model.classes_ else None
+        n_trees = len(self.model.estimators_)
+        n_features = self.model.n_features_in_
+        
+        node_contrib, leaf_votes = [], []
+        bias = 0.0
+        
+        for est in self.model.estimators_:
+            tree = est.tree_
+            value = tree.value[:, 0, :]
+            if cls is None:
+                probs = np.zeros(tree.node_count)
+            else:
+                probs = value[:, cls] / value.sum(axis=1)
+            
+            # Parent and depth of every node; children always follow their parent
+            parent = np.full(tree.node_count, -1)
+            internal = np.where(tree.children_left != -1)[0]
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+            depth = np.zeros(tree.node_count, dtype=int)
+            for node in range(1, tree.node_count):
+                depth[node] = depth[parent[node]] + 1
+            
+            contrib = np.zeros((tree.node_count, n_features))
+            for d in range(1, depth.max() + 1):
+                nodes = np.where(depth == d)[0]
+                contrib[nodes] = contrib[parent[nodes]]
+                contrib[nodes, tree.feature[parent[nodes]]] += probs[nodes] - probs[parent[nodes]]
+            
+            node_contrib.append(contrib / n_trees)
+            # Flood vote of each leaf; only leaves are ever looked up
+            leaf_votes.append((probs > 0.5) / n_trees)
+            bias += probs[0]
+        
+        self._paths = {
+            'node_contrib': node_contrib,
+            'leaf_votes': leaf_votes,
+            'bias': bias / n_trees
+        }
+        return self._paths
+    
+    def explain(self, X_scaled: np.ndarray) -> dict:
+        """Per-row tree-path attributions for a batch of scaled feature rows
+        
+        probability = bias + contributions.sum(axis=1) matches predict_proba
+        for every row, up to floating point rounding.
+        """
+        paths = self._paths or self._build_paths()
+        
+        # One traversal per tree finds each row's leaf; everything else is lookups.
+        # Trees split on float32, as in the forest's own predict.
+        X32 = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        contributions = np.zeros((len(X32), self.model.n_features_in_))
+        flood_votes = np.zeros(len(X32))
+        for est, contrib, votes in zip(self.model.estimators_, paths['node_contrib'], paths['leaf_votes']):
+            leaves = est.tree_.apply(X32)
+            contributions += contrib[leaves]
+            flood_votes += votes[leaves]
+        
+        probability = paths['bias'] + contributions.sum(axis=1)
+        
+        # Confidence is the share of trees whose vote agrees with the ensemble
+        confidence = np.where(probability > 0.5, flood_votes, 1 - flood_votes)
+        
+        return {
+            "probability": probability,
+            "bias": paths['bias'],
+            "contributions": contributions,
+            "confidence": confidence
+        }
+    
+    def _feature_row(self, rainfall: float, water_level: float, soil: float, forecast_rain: float) -> list:
+        """Build a model feature row from current conditions"""
+        return [
+            rainfall,
+            water_level,
+            soil,
+            rainfall * 24 + forecast_rain,
+            rainfall * 24 * 3 + forecast_rain * 2,
+            0.1 if rainfall > 5 else 0
+        ]
+    
+    def _format_prediction(self, probability: float, contributions: np.ndarray, confidence: float) -> dict:
+        """Turn one explained row into the prediction dict used by the dashboard"""
+        ranked = sorted(zip(FEATURE_NAMES, contributions), key=lambda x: -x[1])
+        factors = [name for name, c in ranked[:3] if c > 0.01]
+        
+        return {
+            "risk_level": self._risk_level(probability),
+            "probability": round(float(probability) * 100, 1),
+            "contributing_factors": factors,
+            "factor_contributions": {
+                name: round(float(c) * 100, 1) for name, c in zip(FEATURE_NAMES, contributions)
+            },
+            "confidence": round(float(confidence) * 100, 1),
+            "model_type": "Random Forest ML"
+        }
+    
+    def _risk_level(self, probability: float) -> str:
+        """Map a probability to a risk level"""
+        if probability > 0.7:
+            return "severe"
+        elif probability > 0.5:
+            return "high"
+        elif probability > 0.3:
+            return "moderate"
+        return "low"
+    
     def predict(self, sensors: list, weather: dict) -> dict:
         """Predict flood risk from current conditions"""
         if not self.is_trained:
@@ -72,53 +198,77 @@ class FloodPredictor:
         rainfall = [s['value'] for s in sensors if s['type'] == 'rainfall']
         soil = [s['value'] for s in sensors if s['type'] == 'soil_moisture']
         
-        current = {
-            'rainfall_mm': np.mean(rainfall) if rainfall else 0,
-            'water_level_m': np.mean(water_levels) if water_levels else 1.5,
-            'soil_moisture_pct': np.mean(soil) if soil else 50
-        }
-        
         # Add forecast rainfall
         forecast_rain = sum(f['precipitation'] for f in weather.get('forecast', [])[:3])
         
-        df = pd.DataFrame([{
-            **current,
-            'rainfall_3d': current['rainfall_mm'] * 24 + forecast_rain,
-            'rainfall_7d': current['rainfall_mm'] * 24 * 3 + forecast_rain * 2,
-            'water_level_trend': 0.1 if current['rainfall_mm'] > 5 else 0
-        }])
-        
-        X = df.values
+        X = np.array([self._feature_row(
+            np.mean(rainfall) if rainfall else 0,
+            np.mean(water_levels) if water_levels else 1.5,
+            np.mean(soil) if soil else 50,
+            forecast_rain
+        )])
         X_scaled = self.scaler.transform(X)
         
-        probability = self.model.predict_proba(X_scaled)[0][1]
+        explained = self.explain(X_scaled)
+        return self._format_prediction(
+            explained['probability'][0],
+            explained['contributions'][0],
+            explained['confidence'][0]
+        )
+    
+    def predict_stations(self, sensors: list, weather: dict) -> list:
+        """Predict flood risk for each water level station with its own factor breakdown
         
-        # Determine risk level
-        if probability > 0.7:
-            risk_level = "severe"
-        elif probability > 0.5:
-            risk_level = "high"
-        elif probability > 0.3:
-            risk_level = "moderate"
-        else:
-            risk_level = "low"
-            
-        # Feature importance for contributing factors
-        factors = []
-        importances = self.model.feature_importances_
-        feature_names = ['Rainfall', 'Water Level', 'Soil Moisture', '3-Day Rain', '7-Day Rain', 'Level Trend']
+        Each station is paired with its nearest rainfall and soil moisture sensors,
+        and all stations are explained in a single batch.
+        """
+        stations = [s for s in sensors if s['type'] == 'water_level']
+        rain_sensors = [s for s in sensors if s['type'] == 'rainfall']
+        soil_sensors = [s for s in sensors if s['type'] == 'soil_moisture']
+        if not stations:
+            return []
         
-        for name, imp in sorted(zip(feature_names, importances), key=lambda x: -x[1])[:3]:
-            if imp > 0.1:
-                factors.append(name)
+        def nearest(targets, default):
+            if not targets:
+                return np.full(len(stations), default, dtype=float)
+            a = np.array([[s['lat'], s['lon']] for s in stations])
+            b = np.array([[t['lat'], t['lon']] for t in targets])
+            idx = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+            return np.array([t['value'] for t in targets], dtype=float)[idx]
         
-        return {
-            "risk_level": risk_level,
-            "probability": round(probability * 100, 1),
-            "contributing_factors": factors,
-            "confidence": round(np.mean(importances) * 100, 1),
-            "model_type": "Random Forest ML"
-        }
+        rainfall = nearest(rain_sensors, 0)
+        soil = nearest(soil_sensors, 50)
+        levels = np.array([s['value'] for s in stations], dtype=float)
+        
+        if not self.is_trained:
+            results = []
+            for station, rain, moisture in zip(stations, rainfall, soil):
+                local = [
+                    station,
+                    {'type': 'rainfall', 'value': rain},
+                    {'type': 'soil_moisture', 'value': moisture}
+                ]
+                results.append({"id": station['id'], "name": station['name'],
+                                **self._rule_based_prediction(local, weather)})
+            return results
+        
+        forecast_rain = sum(f['precipitation'] for f in weather.get('forecast', [])[:3])
+        X = np.array([
+            self._feature_row(rain, level, moisture, forecast_rain)
+            for rain, level, moisture in zip(rainfall, levels, soil)
+        ])
+        explained = self.explain(self.scaler.transform(X))
+        
+        return [
+            {"id": station['id'], "name": station['name'],
+             **self._format_prediction(p, c, conf)}
+            for station, p, c, conf in zip(
+                stations,
+                explained['probability'],
+                explained['contributions'],
+                explained['confidence']
+            )
+        ]
     
     def _rule_based_prediction(self, sensors: list, weather: dict) -> dict:
         """Fallback rule-based prediction"""
@@ -137,17 +287,8 @@ class FloodPredictor:
             (avg_soil / 100.0) * 0.25
         )
         
-        if score > 0.7:
-            risk_level = "severe"
-        elif score > 0.5:
-            risk_level = "high"
-        elif score > 0.3:
-            risk_level = "moderate"
-        else:
-            risk_level = "low"
-            
         return {
-            "risk_level": risk_level,
+            "risk_level": self._risk_level(score),
             "probability": round(score * 100, 1),
             "contributing_factors": ["Water Level", "Rainfall"],
             "confidence": 65,
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from models.flood_predictor import FloodPredictor
+
+
+class RegistryError(Exception):
+    """Raised when a registry operation cannot be carried out"""
+
+
+class ModelRegistry:
+    """Versioned flood models with background retraining and atomic hot-swap
+
+    Each version lives in its own directory with the pickled model and a
+    meta.json of metrics. The serving model is a single reference that is
+    only replaced once a new predictor is fully loaded, so predictions in
+    flight keep using the model they started with.
+    """
+
+    def __init__(self, root: Path = Path("models/registry")):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+        self._job = None
+        self.last_error = None
+        self._active = None
+        self._active_version = None
+
+    @property
+    def active_version(self) -> str:
+        return self._active_version
+
+    def serving(self) -> tuple:
+        """The serving version and predictor, read together"""
+        with self._lock:
+            return self._active_version, self._active
+
+    def list_versions(self) -> list:
+        """Metadata for every registered version, oldest first"""
+        versions = []
+        paths = [p for p in self.root.glob("v*/meta.json") if p.parent.name[1:].isdigit()]
+        for meta_path in sorted(paths, key=lambda p: int(p.parent.name[1:])):
+            try:
+                with open(meta_path) as f:
+                    versions.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Error reading {meta_path}: {e}")
+        return versions
+
+    def _next_version(self) -> str:
+        existing = [int(p.name[1:]) for p in self.root.glob("v*") if p.name[1:].isdigit()]
+        return f"v{max(existing, default=0) + 1:04d}"
+
+    def train(self, df) -> str:
+        """Train and register a new version without touching the serving model"""
+        with self._lock:
+            version = self._next_version()
+            version_dir = self.root / version
+            version_dir.mkdir()
+
+        predictor = FloodPredictor(model_path=version_dir / "model.pkl")
+        accuracy = predictor.train(df)
+
+        meta = {
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "metrics": {
+                "training_accuracy": round(float(accuracy), 4),
+                "n_samples": int(len(df)),
+                "flood_events": int(df["flood_event"].sum())
+            }
+        }
+        self._write_json(version_dir / "meta.json", meta)
+        return version
+
+    def _load(self, version: str) -> FloodPredictor:
+        """Load a version fully, ready to serve"""
+        predictor = FloodPredictor(model_path=self.root / version / "model.pkl")
+        if not predictor.load():
+            raise FileNotFoundError(f"No model for version {version}")
+        # Build attribution tables before serving so no request pays for it
+        predictor.prepare()
+        return predictor
+
+    def promote(self, version: str) -> FloodPredictor:
+        """Load a version fully, then swap it in as the serving model"""
+        predictor = self._load(version)
+        with self._lock:
+            self._swap(predictor, version)
+        return predictor
+
+    def _swap(self, predictor: FloodPredictor, version: str):
+        """Make predictor the serving model; caller holds the lock"""
+        self._active = predictor
+        self._active_version = version
+        self._write_json(self.root / "CURRENT.json", {"version": version})
+
+    def load_current(self) -> bool:
+        """Promote the version recorded as current on disk
+
+        Falls back to the newest loadable version if that one is missing or
+        broken, and returns False if nothing can be loaded.
+        """
+        candidates = []
+        current_path = self.root / "CURRENT.json"
+        if current_path.exists():
+            try:
+                with open(current_path) as f:
+                    candidates.append(json.load(f)["version"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error reading current model version: {e}")
+        candidates += [v["version"] for v in reversed(self.list_versions())]
+
+        for version in candidates:
+            try:
+                self.promote(version)
+                return True
+            except Exception as e:
+                print(f"Error loading model {version}: {e}")
+        return False
+
+    def rollback(self) -> str:
+        """Promote the newest loadable version registered before the serving one"""
+        versions = [v["version"] for v in self.list_versions()]
+        if self._active_version not in versions:
+            raise RegistryError("No active version to roll back from")
+        index = versions.index(self._active_version)
+
+        for previous in reversed(versions[:index]):
+            try:
+                self.promote(previous)
+                return previous
+            except Exception as e:
+                print(f"Error loading model {previous}: {e}")
+        raise RegistryError(f"No loadable version older than {self._active_version}")
+
+    def retrain_async(self, data_fn):
+        """Train on data_fn() in the background and promote the result
+
+        Returns the running job's future; a retrain already in progress is
+        reused rather than queued again.
+        """
+        with self._lock:
+            if self._job is not None and not self._job.done():
+                return self._job
+            self._job = self._executor.submit(self._retrain, data_fn)
+            return self._job
+
+    def _retrain(self, data_fn) -> str:
+        """Train and promote, unless the serving version changed meanwhile
+
+        A rollback while training wins; the new version stays registered
+        and can still be promoted by hand.
+        """
+        started_from = self._active_version
+        try:
+            version = self.train(data_fn())
+            predictor = self._load(version)
+            with self._lock:
+                if self._active_version == started_from:
+                    self._swap(predictor, version)
+        except Exception as e:
+            print(f"Error retraining model: {e}")
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        self.last_error = None
+        return version
+
+    @property
+    def is_retraining(self) -> bool:
+        return self._job is not None and not self._job.done()
+
+    def _write_json(self, path: Path, data: dict):
+        """Write JSON via a temp file and rename so readers never see a partial file"""
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
@@ -0,0 +1,251 @@
+import asyncio
+import time
+import numpy as np
+from datetime import datetime, timezone
+from config import STATIONS
+from utils.sensor_wire import SENSOR_TYPES, STATUS_NAMES
+
+SENSOR_UNITS = ["m", "mm/hr", "%"]
+
+# (warning, critical) thresholds per sensor type, same as generate_sensor_data
+STATUS_THRESHOLDS = np.array([
+    [2.5, 3.0],
+    [8.0, 15.0],
+    [75.0, 90.0],
+])
+
+# Change per hour above which a reading counts as rising or falling, per sensor type
+TREND_THRESHOLDS = np.array([0.1, 2.0, 0.5])
+
+# Trends are smoothed over about this many seconds
+TREND_WINDOW = 3600
+
+# Fixed default start so the seed alone determines the readings
+DEFAULT_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class SensorStream:
+    """Seeded, time-correlated sensor stream for load testing
+
+    Rainfall is an AR(1) drizzle process plus storm pulses that reach each
+    sensor after a travel delay proportional to its position along the
+    river, spreading out as they move downstream. Soil moisture and water
+    level relax towards rain-driven targets, so consecutive readings are
+    correlated. All state is held in NumPy arrays and every step produces
+    one vectorized batch.
+    """
+
+    def __init__(self, n_sensors: int = None, seed: int = 0, interval: float = 1.0,
+                 speed: float = 1.0, storms_per_day: float = 2.0, start: datetime = None):
+        self.rng = np.random.default_rng(seed)
+        self.interval = interval
+        self.speed = speed
+        self.storms_per_day = storms_per_day
+        self.start = start or DEFAULT_START
+        self.t = 0.0
+
+        if n_sensors is None:
+            self._init_stations()
+        else:
+            self._init_virtual(n_sensors)
+
+        n = len(self.ids)
+        # Rivers drain west into the Shannon, so east is upstream on each river
+        self.position = np.zeros(n)
+        for r in range(self.n_rivers):
+            on_river = self.river == r
+            if on_river.any():
+                lon = self.lon[on_river]
+                self.position[on_river] = (lon.max() - lon) / max(lon.max() - lon.min(), 1e-9)
+
+        # Sensor indices per river, so storms only touch their own river
+        order = np.argsort(self.river, kind="stable")
+        counts = np.bincount(self.river, minlength=self.n_rivers)
+        self.river_sensors = np.split(order, np.cumsum(counts)[:-1])
+
+        seasonal = 1.0 + 0.3 * np.sin((self.start.month - 4) * np.pi / 6)
+        self.seasonal = seasonal
+        self.base_level = self.rng.uniform(1.2, 2.0, n) * seasonal
+        self.base_soil = self.rng.uniform(50, 70, n) * (0.8 + 0.2 * seasonal)
+
+        self.drizzle = np.zeros(n)
+        self.soil = self.base_soil.copy()
+        self.level = self.base_level.copy()
+        self.value = np.select([self.type == 0, self.type == 1], [self.level, self.drizzle], self.soil)
+        self.rate = np.zeros(n)
+
+        # Active storms: river, start time (s), peak intensity (mm/hr), width (s), travel time (s)
+        self.storms = np.zeros((0, 5))
+
+    def _init_stations(self):
+        """Use the configured stations"""
+        ids, names, types, lat, lon = [], [], [], [], []
+        for code, sensor_type in enumerate(SENSOR_TYPES):
+            for station in STATIONS[sensor_type]:
+                ids.append(station["id"])
+                names.append(station["name"])
+                types.append(code)
+                lat.append(station["lat"])
+                lon.append(station["lon"])
+
+        self.ids = ids
+        self.names = names
+        self.type = np.array(types, dtype=np.int8)
+        self.lat = np.array(lat)
+        self.lon = np.array(lon)
+
+        # Gauges use their configured river; other stations join the river of the nearest gauge
+        gauges = STATIONS["water_level"]
+        rivers = sorted({g["river"] for g in gauges})
+        gauge_river = np.array([rivers.index(g["river"]) for g in gauges])
+        gauge_pos = np.array([[g["lat"], g["lon"]] for g in gauges])
+        pos = np.column_stack([self.lat, self.lon])
+        nearest = ((pos[:, None, :] - gauge_pos[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        self.river = gauge_river[nearest].astype(np.int32)
+        self.n_rivers = len(rivers)
+
+    def _init_virtual(self, n_sensors: int):
+        """Scatter virtual sensors over the county in the configured type mix"""
+        counts = np.array([len(STATIONS[t]) for t in SENSOR_TYPES])
+        self.type = self.rng.choice(len(SENSOR_TYPES), n_sensors, p=counts / counts.sum()).astype(np.int8)
+        self.ids = [f"V{SENSOR_TYPES[t][:1].upper()}{i:06d}" for i, t in enumerate(self.type)]
+        self.names = [f"Virtual {i}" for i in range(n_sensors)]
+        self.lat = self.rng.uniform(53.35, 53.65, n_sensors)
+        self.lon = self.rng.uniform(-7.95, -7.20, n_sensors)
+        # One west-flowing river per latitude band
+        self.n_rivers = max(1, n_sensors // 500)
+        band = (self.lat - 53.35) / 0.30 * self.n_rivers
+        self.river = np.clip(band.astype(np.int32), 0, self.n_rivers - 1)
+
+    def _spawn_storms(self):
+        """Start new storms as a Poisson process per river"""
+        rate = self.storms_per_day * self.interval / 86400
+        new = self.rng.random(self.n_rivers) < rate
+        k = int(new.sum())
+        if k:
+            storms = np.column_stack([
+                np.flatnonzero(new),
+                np.full(k, self.t),
+                self.rng.uniform(5, 25, k) * self.seasonal,
+                self.rng.uniform(1800, 7200, k),
+                self.rng.uniform(3600, 6 * 3600, k),
+            ])
+            self.storms = np.vstack([self.storms, storms])
+
+        # Drop storms that have passed the downstream end
+        if len(self.storms):
+            end = self.storms[:, 1] + self.storms[:, 4] + 3600 + 8 * self.storms[:, 3]
+            self.storms = self.storms[end > self.t]
+
+    def _storm_rain(self, lag: float = 0.0) -> np.ndarray:
+        """Storm rainfall at every sensor, optionally delayed by extra lag seconds"""
+        rain = np.zeros(len(self.ids))
+        for river, t0, peak, width, travel in self.storms:
+            idx = self.river_sensors[int(river)]
+            pos = self.position[idx]
+
+            # Pulses spread out as they travel downstream
+            spread = width * np.sqrt(1 + 2 * pos)
+            arrival = t0 + pos * travel + lag
+            rain[idx] += peak * width / spread * np.exp(-0.5 * ((self.t - arrival) / spread) ** 2)
+        return rain
+
+    def step(self) -> dict:
+        """Advance the simulation by one interval and return a batch"""
+        dt = self.interval
+        n = len(self.ids)
+        self.t += dt
+        self._spawn_storms()
+
+        # AR(1) background drizzle
+        phi = np.exp(-dt / 1800)
+        self.drizzle = np.maximum(0, phi * self.drizzle + np.sqrt(1 - phi ** 2) * 0.8 * self.rng.standard_normal(n))
+        rain = self.drizzle * self.seasonal + self._storm_rain()
+
+        # Soil wets with rain and dries back to its baseline
+        self.soil += dt * (0.0002 * rain - (self.soil - self.base_soil) / 86400)
+        self.soil = np.clip(self.soil, 0, 100)
+
+        # Water level follows the routed storm flow with a slower response
+        flow = self._storm_rain(lag=3600)
+        target = self.base_level + 0.08 * flow
+        alpha = 1 - np.exp(-dt / 3600)
+        self.level += alpha * (target - self.level) + 0.002 * np.sqrt(dt) * self.rng.standard_normal(n)
+
+        previous = self.value
+        self.value = np.select([self.type == 0, self.type == 1], [self.level, rain], self.soil)
+
+        # Rate of change per hour, smoothed so step-to-step noise doesn't flip trends
+        beta = np.exp(-dt / TREND_WINDOW)
+        self.rate = beta * self.rate + (1 - beta) * (self.value - previous) * 3600 / dt
+
+        return self._batch()
+
+    def _batch(self) -> dict:
+        """Package the current readings as arrays"""
+        thresholds = STATUS_THRESHOLDS[self.type]
+        status = (self.value > thresholds[:, 0]).astype(np.int8) + (self.value > thresholds[:, 1])
+
+        return {
+            "timestamp": self.start.timestamp() + self.t,
+            "sensor": np.arange(len(self.ids), dtype=np.int32),
+            "value": self.value.astype(np.float32),
+            "status": status.astype(np.int8),
+            "rate": self.rate.astype(np.float32),
+        }
+
+    def to_sensors(self, batch: dict) -> list:
+        """Convert a batch into the sensor dicts used by the dashboard"""
+        sensors = []
+        for j, i in enumerate(batch["sensor"]):
+            t = self.type[i]
+            rate = batch["rate"][j]
+            threshold = TREND_THRESHOLDS[t]
+            trend = "rising" if rate > threshold else "falling" if rate < -threshold else "stable"
+            sensors.append({
+                "id": self.ids[i],
+                "name": self.names[i],
+                "type": SENSOR_TYPES[t],
+                "value": round(float(batch["value"][j]), 2 if t == 0 else 1),
+                "unit": SENSOR_UNITS[t],
+                "status": STATUS_NAMES[batch["status"][j]],
+                "lat": float(self.lat[i]),
+                "lon": float(self.lon[i]),
+                "trend": trend
+            })
+        return sensors
+
+    def _pause(self) -> float:
+        """Wall-clock seconds between batches at the replay speed"""
+        return self.interval / self.speed if self.speed else 0.0
+
+    def stream(self, steps: int = None):
+        """Yield batches, paced by the replay speed (speed=0 runs flat out)"""
+        pause = self._pause()
+        deadline = time.monotonic()
+        count = 0
+        while steps is None or count < steps:
+            yield self.step()
+            count += 1
+            if pause:
+                deadline += pause
+                time.sleep(max(0.0, deadline - time.monotonic()))
+
+    async def astream(self, steps: int = None):
+        """Async version of stream()"""
+        pause = self._pause()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        count = 0
+        while steps is None or count < steps:
+            yield self.step()
+            count += 1
+            if pause:
+                deadline += pause
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+    def __iter__(self):
+        return self.stream()
+
+    def __aiter__(self):
+        return self.astream()
@@ -0,0 +1,177 @@
+import numpy as np
+from datetime import datetime
+
+# Compact binary batch format for sensor readings
+#
+#   header   24 bytes  magic "WWB2", flags, n_ids, n_records, base timestamp
+#   id table           only with FLAG_ID_TABLE: u32 byte length, then the
+#                      station IDs as UTF-8 joined by newlines
+#   records  14 bytes  each, fixed layout (RECORD_DTYPE)
+#
+# Station IDs are interned to integers; a batch without FLAG_ID_TABLE reuses
+# the table from the previous batch on the same stream.
+
+MAGIC = b"WWB2"
+
+FLAG_ID_TABLE = 1
+
+# Type and status codes are part of the protocol; index = code on the wire
+SENSOR_TYPES = ["water_level", "rainfall", "soil_moisture"]
+STATUS_NAMES = ["normal", "warning", "critical"]
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("flags", "<u4"),
+    ("n_ids", "<u4"),
+    ("n_records", "<u4"),
+    ("timestamp", "<f8"),
+])
+
+RECORD_DTYPE = np.dtype([
+    ("sensor", "<u4"),
+    ("offset", "<f4"),
+    ("value", "<f4"),
+    ("type", "u1"),
+    ("status", "u1"),
+])
+
+TABLE_LEN_DTYPE = np.dtype("<u4")
+
+
+class WireFormatError(ValueError):
+    """Raised when a buffer is not a valid sensor batch"""
+
+
+def encode_batch(timestamp: float, sensor, value, sensor_type, status, offset=None, ids: list = None) -> bytes:
+    """Encode arrays of readings into one binary batch
+
+    Pass ids to embed the station ID table, or leave it out to reuse the
+    table already sent on this stream.
+    """
+    if ids is not None and any("\n" in i for i in ids):
+        raise WireFormatError("Station IDs must not contain newlines")
+
+    sensor = np.asarray(sensor)
+    n = len(sensor)
+
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    records["sensor"] = sensor
+    records["offset"] = 0 if offset is None else offset
+    records["value"] = value
+    records["type"] = sensor_type
+    records["status"] = status
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["flags"] = FLAG_ID_TABLE if ids is not None else 0
+    header["n_ids"] = len(ids) if ids is not None else 0
+    header["n_records"] = n
+    header["timestamp"] = timestamp
+
+    parts = [header.tobytes()]
+    if ids is not None:
+        table = "\n".join(ids).encode("utf-8")
+        parts.append(np.array(len(table), dtype=TABLE_LEN_DTYPE).tobytes())
+        parts.append(table)
+    parts.append(records.tobytes())
+    return b"".join(parts)
+
+
+def decode_batch(buf, ids: list = None) -> dict:
+    """Decode one binary batch into NumPy arrays without copying the records
+
+    ids is the table from an earlier batch, used when this one has none.
+    """
+    batch, _ = _decode_at(memoryview(buf), 0, ids)
+    return batch
+
+
+def _decode_at(view: memoryview, pos: int, ids: list):
+    """Decode the batch starting at pos, returning it and the end position"""
+    if len(view) - pos < HEADER_DTYPE.itemsize:
+        raise WireFormatError("Truncated batch header")
+    header = np.frombuffer(view, dtype=HEADER_DTYPE, count=1, offset=pos)[0]
+    if header["magic"] != MAGIC:
+        raise WireFormatError("Not a sensor batch")
+    pos += HEADER_DTYPE.itemsize
+
+    if header["flags"] & FLAG_ID_TABLE:
+        if pos + TABLE_LEN_DTYPE.itemsize > len(view):
+            raise WireFormatError("Truncated station ID table length")
+        size = int(np.frombuffer(view, dtype=TABLE_LEN_DTYPE, count=1, offset=pos)[0])
+        pos += TABLE_LEN_DTYPE.itemsize
+        if pos + size > len(view):
+            raise WireFormatError("Truncated station ID table")
+        try:
+            table = bytes(view[pos:pos + size]).decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise WireFormatError("Station ID table is not valid UTF-8") from e
+        ids = table.split("\n") if table else []
+        if len(ids) != header["n_ids"]:
+            raise WireFormatError("Station ID table does not match header")
+        pos += size
+    elif ids is None:
+        raise WireFormatError("Batch has no station ID table and none was given")
+
+    n = int(header["n_records"])
+    end = pos + n * RECORD_DTYPE.itemsize
+    if end > len(view):
+        raise WireFormatError("Truncated batch records")
+    records = np.frombuffer(view, dtype=RECORD_DTYPE, count=n, offset=pos)
+
+    # Reject out-of-range codes here rather than at the first consumer
+    if n:
+        if records["sensor"].max() >= len(ids):
+            raise WireFormatError("Sensor index outside the station ID table")
+        if records["type"].max() >= len(SENSOR_TYPES):
+            raise WireFormatError("Unknown sensor type code")
+        if records["status"].max() >= len(STATUS_NAMES):
+            raise WireFormatError("Unknown status code")
+
+    return {
+        "timestamp": float(header["timestamp"]),
+        "ids": ids,
+        "sensor": records["sensor"],
+        "offset": records["offset"],
+        "value": records["value"],
+        "type": records["type"],
+        "status": records["status"],
+    }, end
+
+
+def read_batches(buf):
+    """Yield every batch in a buffer of concatenated batches, carrying the ID table forward"""
+    view = memoryview(buf)
+    pos = 0
+    ids = None
+    while pos < len(view):
+        batch, pos = _decode_at(view, pos, ids)
+        ids = batch["ids"]
+        yield batch
+
+
+def encode_sensors(sensors: list, timestamp: float = None) -> bytes:
+    """Encode dashboard sensor dicts as one self-contained batch"""
+    type_codes = {name: i for i, name in enumerate(SENSOR_TYPES)}
+    status_codes = {name: i for i, name in enumerate(STATUS_NAMES)}
+
+    return encode_batch(
+        datetime.now().timestamp() if timestamp is None else timestamp,
+        sensor=np.arange(len(sensors)),
+        value=[s["value"] for s in sensors],
+        sensor_type=[type_codes[s["type"]] for s in sensors],
+        status=[status_codes[s["status"]] for s in sensors],
+        ids=[s["id"] for s in sensors],
+    )
+
+
+def encode_stream_batch(stream, batch: dict, include_ids: bool = True) -> bytes:
+    """Encode a SensorStream batch, optionally leaving out the ID table"""
+    return encode_batch(
+        batch["timestamp"],
+        sensor=batch["sensor"],
+        value=batch["value"],
+        sensor_type=stream.type[batch["sensor"]],
+        status=batch["status"],
+        ids=stream.ids if include_ids else None,
+    )